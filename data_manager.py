@@ -1,5 +1,5 @@
 import os
-import json
+import orjson
 import pandas as pd
 from datetime import datetime, timedelta
 
@@ -22,15 +22,15 @@ def ensure_data_dir():
 def save_data(data, filename):
     """Save data to a JSON file."""
     filepath = os.path.join(DATA_DIR, filename)
-    with open(filepath, 'w') as f:
-        json.dump({'timestamp': datetime.now().isoformat(), 'data': data}, f)
+    with open(filepath, 'wb') as f:
+        f.write(orjson.dumps({'timestamp': datetime.now().isoformat(), 'data': data}))
 
 def load_data(filename):
     """Load data from a JSON file if it exists and is not expired."""
     filepath = os.path.join(DATA_DIR, filename)
     if os.path.exists(filepath):
-        with open(filepath, 'r') as f:
-            cached = json.load(f)
+        with open(filepath, 'rb') as f:
+            cached = orjson.loads(f.read())
             cache_time = datetime.fromisoformat(cached['timestamp'])
             if datetime.now() - cache_time < CACHE_DURATION:
                 return cached['data']
@@ -42,7 +42,9 @@ def get_or_fetch_data(fetch_func, filename):
     data = load_data(filename)
     if data is None:
         data = fetch_func()
-        save_data(data, filename)
+        if data:
+            # Failed fetches return nothing; don't pin that in the cache
+            save_data(data, filename)
     return data
 
 # Functions to get each type of data
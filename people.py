@@ -1,10 +1,13 @@
-import requests
 import logging
 import os
 import json
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import streamlit as st
+
+from utils import CACHE_MAX_AGE, FRAME_HASH_FUNCS, downsample_scatter, fetch_swapi, top_n, top_value_counts
 
 # Configure logging
 logging.basicConfig(
@@ -28,26 +31,17 @@ def cache_people_data(people_data, cache_file='people_cache.json'):
     with open(cache_file, 'w') as f:
         json.dump(people_data, f)
 
+@st.cache_data(show_spinner=False, ttl=CACHE_MAX_AGE)
 def fetch_people_data():
-    """Fetch people data from local cache or SWAPI."""
-    try:
-        with open('people_cache.json', 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        url = "https://swapi.dev/api/people/"
-        all_people = []
-        
-        while url:
-            response = requests.get(url)
-            data = response.json()
-            all_people.extend(data['results'])
-            url = data.get('next')
-        
-        with open('people_cache.json', 'w') as f:
-            json.dump(all_people, f)
-        
-        return all_people
+    """
+    Fetch people data from local cache or SWAPI, revalidating caches older than a day.
+
+    app.py reaches this through data_manager, whose own data/people.json cache
+    is kept for seven days, so the app only re-checks SWAPI once that expires.
+    """
+    return fetch_swapi("https://swapi.dev/api/people/", 'people_cache.json')
 
+@st.cache_data(show_spinner=False)
 def create_people_dataframe(people_data):
     """
     Create a Pandas DataFrame from the people data.
@@ -59,16 +53,45 @@ def create_people_dataframe(people_data):
         
         df = pd.DataFrame(people_data)
         
-        # Convert numeric fields safely
+        # Convert numeric fields safely, treating 'unknown' as missing
         numeric_fields = ['height', 'mass']
         for field in numeric_fields:
-            df[field] = pd.to_numeric(df[field], errors='coerce')
+            df[field] = pd.to_numeric(df[field].replace({'unknown': np.nan}), errors='coerce')
         
-        return df
+        return prepare_people_df(df)
     except Exception as e:
         logging.error(f"Failed to create DataFrame: {e}")
         return pd.DataFrame()
 
+def prepare_people_df(df):
+    """
+    Add every derived column used by the analyses in a single pass.
+    The analyze_* functions only read from the resulting frame, so it can be
+    shared between them (and cached) without being modified.
+    """
+    df['height'] = df['height'].astype('float32')
+    df['mass'] = df['mass'].astype('float32')
+    
+    # Clean up homeworld URLs to show just "Planet X"
+    homeworld = df['homeworld'].fillna('').astype(str)
+    df['homeworld_clean'] = (
+        ('Planet ' + homeworld.str.split('/').str[-2])
+        .where(homeworld.str.contains('planets', regex=False), 'Unknown')
+        .astype('category')
+    )
+    
+    df['species_first'] = df['species'].str[0].fillna('Unknown').astype('category')
+    
+    # Accumulate the popularity index into a single int32 buffer
+    film_count = df['films'].str.len().fillna(0).to_numpy('i4')
+    popularity = film_count * 2  # Weight film appearances more heavily
+    popularity += df['vehicles'].str.len().fillna(0).to_numpy('i4')
+    popularity += df['starships'].str.len().fillna(0).to_numpy('i4')
+    df['film_count'] = film_count
+    df['popularity_index'] = popularity
+    
+    return df
+
 def validate_people_dataframe(df):
     """
     Validate the structure and content of the DataFrame.
@@ -86,6 +109,7 @@ def validate_people_dataframe(df):
     
     return True
 
+@st.cache_data(show_spinner=False, hash_funcs=FRAME_HASH_FUNCS)
 def analyze_gender_distribution(df):
     """Create an optimized gender distribution visualization."""
     gender_counts = df['gender'].value_counts()
@@ -106,27 +130,38 @@ def analyze_gender_distribution(df):
     
     return fig
 
+@st.cache_data(show_spinner=False, hash_funcs=FRAME_HASH_FUNCS)
 def analyze_physical_attributes(df):
     """Create an optimized physical attributes visualization."""
-    # Convert height and mass to numeric, handling 'unknown' values
-    df['height'] = pd.to_numeric(df['height'].replace('unknown', '0'), errors='coerce')
-    df['mass'] = pd.to_numeric(df['mass'].replace('unknown', '0'), errors='coerce')
+    # Height and mass are already numeric; keep rows with known, positive values
+    df_filtered = df[df['height'].notna() & (df['height'] > 0) & df['mass'].notna() & (df['mass'] > 0)]
+    df_filtered = downsample_scatter(df_filtered, 'height', 'mass')
     
-    # Filter out zero values
-    df_filtered = df[(df['height'] > 0) & (df['mass'] > 0)]
+    # Build one WebGL trace per gender directly from numpy arrays
+    x_arr = df_filtered['height'].to_numpy()
+    y_arr = df_filtered['mass'].to_numpy()
+    name_arr = df_filtered['name'].to_numpy()
+    gender_arr = df_filtered['gender'].to_numpy()
+    palette = px.colors.qualitative.Set3
     
-    fig = px.scatter(
-        df_filtered,
-        x='height',
-        y='mass',
-        title='Character Physical Attributes',
-        labels={'height': 'Height (cm)', 'mass': 'Mass (kg)'},
-        color='gender',
-        hover_data=['name'],
-        color_discrete_sequence=px.colors.qualitative.Set3
-    )
+    fig = go.Figure()
+    for i, gender in enumerate(pd.unique(gender_arr)):
+        mask = gender_arr == gender
+        fig.add_trace(go.Scattergl(
+            x=x_arr[mask],
+            y=y_arr[mask],
+            mode='markers',
+            name=gender,
+            marker=dict(color=palette[i % len(palette)]),
+            text=name_arr[mask],
+            hoverinfo='text+x+y'
+        ))
     
     fig.update_layout(
+        title='Character Physical Attributes',
+        xaxis_title='Height (cm)',
+        yaxis_title='Mass (kg)',
+        legend_title_text='gender',
         showlegend=True,
         plot_bgcolor='rgba(0,0,0,0)',
         paper_bgcolor='rgba(0,0,0,0)',
@@ -135,13 +170,11 @@ def analyze_physical_attributes(df):
     
     return fig
 
+@st.cache_data(show_spinner=False, hash_funcs=FRAME_HASH_FUNCS)
 def analyze_homeworld_statistics(df):
     """Create an optimized homeworld statistics visualization."""
-    # Clean up homeworld URLs to show just "Planet X"
-    df['homeworld_clean'] = df['homeworld'].apply(lambda x: f"Planet {x.split('/')[-2]}" if pd.notnull(x) and 'planets' in str(x) else 'Unknown')
-    
     # Get top 10 homeworlds
-    homeworld_counts = df['homeworld_clean'].value_counts().head(10)
+    homeworld_counts = top_value_counts(df['homeworld_clean'], 10)
     
     fig = px.bar(
         x=homeworld_counts.index,
@@ -167,22 +200,18 @@ def analyze_film_appearances(df):
     Analyze and visualize the number of films each character appears in.
     """
     try:
-        # Count the number of films per character
-        df['film_count'] = df['films'].apply(lambda films: len(films) if isinstance(films, list) else 0)
-
         # Top 10 characters by film appearances
-        top_characters = df.nlargest(10, 'film_count')
+        top_characters = top_n(df, 'film_count', 10)
 
         logging.info("Top characters by film appearances:")
         logging.info(top_characters[['name', 'film_count']])
 
         # Visualization
-        fig = px.bar(
-            top_characters,
-            x='name',
-            y='film_count',
+        fig = go.Figure([go.Bar(x=top_characters['name'].to_numpy(), y=top_characters['film_count'].to_numpy())])
+        fig.update_layout(
             title='Top 10 Characters by Film Appearances',
-            labels={'name': 'Character', 'film_count': 'Number of Films'}
+            xaxis_title='Character',
+            yaxis_title='Number of Films'
         )
         fig.show()
     except Exception as e:
@@ -193,8 +222,7 @@ def analyze_species_diversity_interactive(df):
     Analyze species diversity with an interactive option to view character details.
     """
     try:
-        species_counts = df['species'].apply(lambda species: species[0] if isinstance(species, list) and species else 'Unknown')
-        species_counts = species_counts.value_counts()
+        species_counts = df['species_first'].value_counts()
 
         # Generate custom labels
         custom_labels = {original: f"Species {i + 1}" for i, original in enumerate(species_counts.index)}
@@ -224,20 +252,21 @@ def analyze_species_diversity_interactive(df):
     except Exception as e:
         logging.error(f"Failed to analyze interactive species diversity: {e}")
 
+@st.cache_data(show_spinner=False, hash_funcs=FRAME_HASH_FUNCS)
 def analyze_numeric_correlations(df):
     """Analyze and visualize correlations between numeric fields."""
     try:
-        # Convert height and mass to numeric
-        df['height'] = pd.to_numeric(df['height'].replace('unknown', '0'), errors='coerce')
-        df['mass'] = pd.to_numeric(df['mass'].replace('unknown', '0'), errors='coerce')
-        
-        # Create correlation matrix
-        numeric_df = df[['height', 'mass']].copy()
-        correlation = numeric_df.corr()
+        # Create correlation matrix from complete rows only
+        fields = ['height', 'mass']
+        arr = np.ascontiguousarray(df[fields].to_numpy(dtype=np.float32))
+        mask = np.isfinite(arr).all(axis=1)
+        correlation = np.corrcoef(arr[mask].T)
         
         # Create heatmap
         fig = px.imshow(
             correlation,
+            x=fields,
+            y=fields,
             title='Correlation between Physical Attributes',
             labels=dict(color="Correlation"),
             color_continuous_scale='RdBu'
@@ -254,27 +283,19 @@ def analyze_numeric_correlations(df):
         logging.error(f"Failed to analyze numeric correlations: {e}")
         return None
 
+@st.cache_data(show_spinner=False, hash_funcs=FRAME_HASH_FUNCS)
 def calculate_popularity_index(df):
-    """Calculate a custom popularity index for each character."""
+    """Visualize the custom popularity index computed by prepare_people_df."""
     try:
-        df['popularity_index'] = (
-            df['films'].str.len() * 2 +  # Weight film appearances more heavily
-            df['vehicles'].str.len() +
-            df['starships'].str.len()
-        )
-        
         # Get top 10 most popular characters
-        top_characters = df.nlargest(10, 'popularity_index')
+        top_characters = top_n(df, 'popularity_index', 10)
         
-        fig = px.bar(
-            top_characters,
-            x='name',
-            y='popularity_index',
-            title='Top 10 Most Popular Characters',
-            labels={'name': 'Character', 'popularity_index': 'Popularity Index'}
-        )
+        fig = go.Figure([go.Bar(x=top_characters['name'].to_numpy(), y=top_characters['popularity_index'].to_numpy())])
         
         fig.update_layout(
+            title='Top 10 Most Popular Characters',
+            xaxis_title='Character',
+            yaxis_title='Popularity Index',
             xaxis_tickangle=-45,
             plot_bgcolor='rgba(0,0,0,0)',
             paper_bgcolor='rgba(0,0,0,0)',
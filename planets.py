@@ -1,30 +1,20 @@
-import requests
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import json
 import logging
 import streamlit as st
 
+from utils import CACHE_MAX_AGE, FRAME_HASH_FUNCS, count_tokens, downsample_scatter, fetch_swapi, top_n
+
+@st.cache_data(show_spinner=False, ttl=CACHE_MAX_AGE)
 def fetch_planets_data():
-    """Fetch planets data from local cache or SWAPI."""
-    try:
-        with open('planets_cache.json', 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        url = "https://swapi.dev/api/planets/"
-        all_planets = []
-        
-        while url:
-            response = requests.get(url)
-            data = response.json()
-            all_planets.extend(data['results'])
-            url = data.get('next')
-        
-        with open('planets_cache.json', 'w') as f:
-            json.dump(all_planets, f)
-        
-        return all_planets
+    """
+    Fetch planets data from local cache or SWAPI, revalidating caches older than a day.
+
+    app.py reaches this through data_manager, whose own data/planets.json cache
+    is kept for seven days, so the app only re-checks SWAPI once that expires.
+    """
+    return fetch_swapi("https://swapi.dev/api/planets/", 'planets_cache.json')
 
 def safe_numeric_conversion(value):
     """Safely convert string values to numeric, handling 'unknown' values."""
@@ -35,6 +25,7 @@ def safe_numeric_conversion(value):
     except (ValueError, TypeError):
         return 0
 
+@st.cache_data(show_spinner=False)
 def create_planets_dataframe(planets_data):
     """Create and clean the planets DataFrame."""
     if not planets_data:
@@ -50,13 +41,33 @@ def create_planets_dataframe(planets_data):
     
     return df
 
+def surface_water_scatter(df, x, y, title, labels):
+    """Build a WebGL scatter of x vs y coloured by surface water, straight from numpy arrays."""
+    fig = go.Figure([
+        go.Scattergl(
+            x=df[x].to_numpy(),
+            y=df[y].to_numpy(),
+            mode='markers',
+            marker=dict(
+                color=df['surface_water'].to_numpy(),
+                colorscale='Viridis',
+                showscale=True,
+                colorbar=dict(title=labels['surface_water'])
+            ),
+            text=df['name'].to_numpy(),
+            hoverinfo='text+x+y'
+        )
+    ])
+    fig.update_layout(title=title, xaxis_title=labels[x], yaxis_title=labels[y])
+    return fig
+
+@st.cache_data(show_spinner=False, hash_funcs=FRAME_HASH_FUNCS)
 def analyze_climate_distribution(df):
     """Create visualizations for climate analysis."""
     figures = {}
     
     # Pie chart of climate distribution
-    climate_series = df['climate'].str.split(',').explode().str.strip()
-    climate_counts = climate_series.value_counts().head(8)
+    climate_counts = count_tokens(df['climate'], 8)
     
     figures['pie'] = px.pie(
         values=climate_counts.values,
@@ -94,24 +105,27 @@ def analyze_climate_distribution(df):
     
     return figures
 
+@st.cache_data(show_spinner=False, hash_funcs=FRAME_HASH_FUNCS)
 def analyze_population_metrics(df):
     """Create visualizations for population analysis."""
     figures = {}
     
     # Bar chart of most populated planets
-    top_planets = df[df['population'] > 0].nlargest(10, 'population')
+    top_planets = top_n(df[df['population'] > 0], 'population', 10)
     
-    figures['bar'] = px.bar(
-        top_planets,
-        x='name',
-        y='population',
-        title='Top 10 Most Populated Planets',
-        color='population',
-        color_continuous_scale='Viridis',
-        labels={'name': 'Planet Name', 'population': 'Population'}
-    )
+    population = top_planets['population'].to_numpy()
+    figures['bar'] = go.Figure([
+        go.Bar(
+            x=top_planets['name'].to_numpy(),
+            y=population,
+            marker=dict(color=population, colorscale='Viridis')
+        )
+    ])
     
     figures['bar'].update_layout(
+        title='Top 10 Most Populated Planets',
+        xaxis_title='Planet Name',
+        yaxis_title='Population',
         xaxis_tickangle=-45,
         showlegend=False,
         plot_bgcolor='rgba(0,0,0,0)',
@@ -120,19 +134,17 @@ def analyze_population_metrics(df):
     )
     
     # Scatter plot of population vs diameter
-    figures['scatter'] = px.scatter(
-        df[df['population'] > 0],
-        x='diameter',
-        y='population',
+    populated_df = downsample_scatter(df[df['population'] > 0], 'diameter', 'population')
+    figures['scatter'] = surface_water_scatter(
+        populated_df,
+        'diameter',
+        'population',
         title='Population vs Planet Size',
-        color='surface_water',
-        hover_data=['name'],
         labels={
             'diameter': 'Diameter (km)',
             'population': 'Population',
             'surface_water': 'Surface Water (%)'
-        },
-        color_continuous_scale='Viridis'
+        }
     )
     
     figures['scatter'].update_layout(
@@ -143,13 +155,13 @@ def analyze_population_metrics(df):
     
     return figures
 
+@st.cache_data(show_spinner=False, hash_funcs=FRAME_HASH_FUNCS)
 def analyze_terrain_distribution(df):
     """Create visualizations for terrain analysis."""
     figures = {}
     
     # Process terrain data
-    terrain_series = df['terrain'].str.split(',').explode().str.strip()
-    terrain_counts = terrain_series.value_counts().head(10)
+    terrain_counts = count_tokens(df['terrain'], 10)
     
     # Bar chart of terrain types
     figures['bar'] = px.bar(
@@ -189,6 +201,7 @@ def analyze_terrain_distribution(df):
     
     return figures
 
+@st.cache_data(show_spinner=False, hash_funcs=FRAME_HASH_FUNCS)
 def analyze_characteristics(df):
     """Create visualizations for planet characteristics."""
     figures = {}
@@ -199,20 +212,18 @@ def analyze_characteristics(df):
         (df['rotation_period'] > 0) & 
         (df['rotation_period'] < 1000)
     ]
+    filtered_df = downsample_scatter(filtered_df, 'diameter', 'rotation_period')
     
-    figures['scatter1'] = px.scatter(
+    figures['scatter1'] = surface_water_scatter(
         filtered_df,
-        x='diameter',
-        y='rotation_period',
+        'diameter',
+        'rotation_period',
         title='Planet Size vs Rotation Period',
-        color='surface_water',
-        hover_data=['name'],
         labels={
             'diameter': 'Diameter (km)',
             'rotation_period': 'Rotation Period (hours)',
             'surface_water': 'Surface Water (%)'
-        },
-        color_continuous_scale='Viridis'
+        }
     )
     
     figures['scatter1'].update_layout(
@@ -228,20 +239,18 @@ def analyze_characteristics(df):
         (df['orbital_period'] < 2000) & 
         (df['rotation_period'] < 1000)
     ]
+    filtered_df = downsample_scatter(filtered_df, 'orbital_period', 'rotation_period')
     
-    figures['scatter2'] = px.scatter(
+    figures['scatter2'] = surface_water_scatter(
         filtered_df,
-        x='orbital_period',
-        y='rotation_period',
+        'orbital_period',
+        'rotation_period',
         title='Orbital Period vs Rotation Period',
-        color='surface_water',
-        hover_data=['name'],
         labels={
             'orbital_period': 'Orbital Period (days)',
             'rotation_period': 'Rotation Period (hours)',
             'surface_water': 'Surface Water (%)'
-        },
-        color_continuous_scale='Viridis'
+        }
     )
     
     figures['scatter2'].update_layout(
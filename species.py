@@ -1,11 +1,12 @@
 import os
-import requests
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import logging
 import plotly.express as px
-import json
+import msgspec
+
+from utils import cached_figures, fetch_swapi_concurrently, write_dashboard
 
 # Configure logging
 logging.basicConfig(
@@ -17,7 +18,8 @@ logging.basicConfig(
 
 # Global variables
 API_URL = "https://swapi.dev/api/species/"
-CSV_FILE = "species_data.csv"
+PARQUET_FILE = "species_data.parquet"
+CACHE_FILE = "species_cache.msgpack"
 
 # SECTION 1: Data Fetching
 def fetch_species_data():
@@ -28,20 +30,13 @@ def fetch_species_data():
         list: A list of species data.
     """
     try:
-        with open('species_cache.json', 'r') as f:
-            return json.load(f)
+        with open(CACHE_FILE, 'rb') as f:
+            return msgspec.msgpack.decode(f.read(), type=list)
     except FileNotFoundError:
-        url = "https://swapi.dev/api/species/"
-        all_species = []
-        
-        while url:
-            response = requests.get(url)
-            data = response.json()
-            all_species.extend(data['results'])
-            url = data.get('next')
+        all_species = fetch_swapi_concurrently(API_URL)
         
-        with open('species_cache.json', 'w') as f:
-            json.dump(all_species, f)
+        with open(CACHE_FILE, 'wb') as f:
+            f.write(msgspec.msgpack.encode(all_species))
         
         return all_species
 
@@ -62,39 +57,54 @@ def create_species_dataframe(species_data):
     df = pd.DataFrame(species_data)
     
     # Fill missing values
-    df['homeworld'].fillna('Unknown', inplace=True)
-    df['language'].fillna('Unknown', inplace=True)
-    df['classification'].fillna('Unknown', inplace=True)
-    df['designation'].fillna('Unknown', inplace=True)
+    df = df.fillna({
+        'homeworld': 'Unknown',
+        'language': 'Unknown',
+        'classification': 'Unknown',
+        'designation': 'Unknown'
+    })
     
     # Convert numeric columns
     numeric_columns = ['average_height', 'average_lifespan']
     for col in numeric_columns:
         df[col] = pd.to_numeric(df[col].replace('unknown', '0'), errors='coerce')
     
+    # Normalize classifications before categorizing so variants share one code
+    df['classification'] = df['classification'].str.lower().replace({
+        'mammals': 'mammal',
+        'reptilian': 'reptile'
+    })
+    
+    # Store low-cardinality text columns as categories
+    categorical_columns = ['classification', 'designation', 'language', 'homeworld']
+    for col in categorical_columns:
+        df[col] = df[col].astype('category')
+    
     return df
 
 # SECTION 3: Data Storage and Loading
 def load_or_fetch_species_data():
     """
-    Load species data from a CSV file if it exists, otherwise fetch it from the API.
+    Load species data from a Parquet file if it exists, otherwise fetch it from the API.
     
     Returns:
         pd.DataFrame: Cleaned DataFrame containing species data.
     """
-    if os.path.exists(CSV_FILE):
-        print(f"Loading species data from {CSV_FILE}...")
-        df = pd.read_csv(CSV_FILE)
+    if os.path.exists(PARQUET_FILE):
+        print(f"Loading species data from {PARQUET_FILE}...")
+        df = pd.read_parquet(PARQUET_FILE)
     else:
         print("Fetching species data from API...")
         raw_data = fetch_species_data()
         print("Cleaning data...")
         df = create_species_dataframe(raw_data)
-        print(f"Saving cleaned data to {CSV_FILE}...")
-        df.to_csv(CSV_FILE, index=False)
+        print(f"Saving cleaned data to {PARQUET_FILE}...")
+        df.to_parquet(PARQUET_FILE, compression='zstd', index=False)
     return df
 
 # SECTION 4: Data Analysis
+# The analyze_* functions treat the DataFrame as read-only; all cleaning and
+# normalization happens once in create_species_dataframe.
 def count_species(df):
     """
     Count the total number of species available in the dataset.
@@ -109,21 +119,18 @@ def count_species(df):
     print(f"Total number of species: {total_species}")
     return total_species
 
+@cached_figures('classification', 'average_height')
 def analyze_classification_distribution(df):
     """
     Analyze and visualize the distribution of species classifications.
+    Classifications are already normalized by create_species_dataframe,
+    so the DataFrame is only read here.
     
     Args:
         df (pd.DataFrame): DataFrame containing species data.
     """
     figures = {}
     
-    # Normalize classifications
-    df['classification'] = df['classification'].str.lower().replace({
-        'mammals': 'mammal',
-        'reptilian': 'reptile'
-    })
-    
     # Classification pie chart
     class_counts = df['classification'].value_counts()
     
@@ -142,7 +149,7 @@ def analyze_classification_distribution(df):
     )
     
     # Classification vs average height
-    avg_height = df.groupby('classification')['average_height'].mean().sort_values(ascending=False)
+    avg_height = df.groupby('classification', observed=True, sort=False)['average_height'].mean().sort_values(ascending=False)
     
     figures['bar'] = px.bar(
         x=avg_height.index,
@@ -163,6 +170,7 @@ def analyze_classification_distribution(df):
     
     return figures
 
+@cached_figures('name', 'average_lifespan', 'average_height', 'classification')
 def analyze_lifespan_distribution(df):
     """
     Analyze and visualize the lifespan trends of species.
@@ -172,11 +180,9 @@ def analyze_lifespan_distribution(df):
     """
     figures = {}
     
-    # Filter valid lifespan data
-    lifespan_df = df[df['average_lifespan'] > 0].copy()
-    
-    # Top 10 longest-living species
-    top_lifespan = lifespan_df.nlargest(10, 'average_lifespan')
+    # Top 10 longest-living species, keeping only valid lifespans
+    top_lifespan = df.nlargest(10, 'average_lifespan')
+    top_lifespan = top_lifespan[top_lifespan['average_lifespan'] > 0]
     
     figures['bar'] = px.bar(
         top_lifespan,
@@ -219,6 +225,7 @@ def analyze_lifespan_distribution(df):
     
     return figures
 
+@cached_figures('language')
 def analyze_language_distribution(df):
     """
     Analyze and visualize the distribution of species languages.
@@ -265,6 +272,7 @@ def analyze_language_distribution(df):
     
     return figures
 
+@cached_figures('designation', 'average_height', 'skin_colors', 'hair_colors', 'eye_colors')
 def analyze_physical_traits(df):
     """
     Analyze and visualize the physical traits of species.
@@ -275,7 +283,7 @@ def analyze_physical_traits(df):
     figures = {}
     
     # Height distribution by designation
-    height_by_designation = df.groupby('designation')['average_height'].mean().sort_values(ascending=False)
+    height_by_designation = df.groupby('designation', observed=True, sort=False)['average_height'].mean().sort_values(ascending=False)
     
     figures['bar'] = px.bar(
         x=height_by_designation.index,
@@ -294,19 +302,15 @@ def analyze_physical_traits(df):
         font=dict(color='white')
     )
     
-    # Create a color characteristics summary
-    color_data = []
-    for col in ['skin_colors', 'hair_colors', 'eye_colors']:
-        colors = df[col].str.split(',').explode().str.strip()
-        top_colors = colors.value_counts().head(5)
-        for color, count in top_colors.items():
-            color_data.append({
-                'feature': col.replace('_colors', '').title(),
-                'color': color,
-                'count': count
-            })
+    # Create a color characteristics summary: top 5 colors for every feature in one pass
+    colors = df[['skin_colors', 'hair_colors', 'eye_colors']].melt(var_name='feature', value_name='color')
+    colors['color'] = colors['color'].str.split(',')
+    colors = colors.explode('color')
+    colors['color'] = colors['color'].str.strip()
+    colors['feature'] = colors['feature'].str.replace('_colors', '', regex=False).str.title()
     
-    color_df = pd.DataFrame(color_data)
+    counts = colors.groupby(['feature', 'color'], observed=True, sort=False).size().rename('count').reset_index()
+    color_df = counts.sort_values('count', ascending=False, kind='stable').groupby('feature', sort=False).head(5)
     
     figures['color_bar'] = px.bar(
         color_df,
@@ -337,8 +341,6 @@ def main():
 
     # Analyze classification distribution
     classification_figs = analyze_classification_distribution(species_df)
-    classification_figs['pie'].show()
-    classification_figs['bar'].show()
 
     # Analyze designation distribution
     designation_counts = species_df['designation'].value_counts()
@@ -350,18 +352,24 @@ def main():
 
     # Analyze lifespan distribution
     lifespan_figs = analyze_lifespan_distribution(species_df)
-    lifespan_figs['bar'].show()
-    lifespan_figs['scatter'].show()
 
     # Analyze language distribution
     language_figs = analyze_language_distribution(species_df)
-    language_figs['bar'].show()
-    language_figs['pie'].show()
 
     # Analyze physical traits
     physical_traits_figs = analyze_physical_traits(species_df)
-    physical_traits_figs['bar'].show()
-    physical_traits_figs['color_bar'].show()
+
+    # Show every figure on a single dashboard page
+    write_dashboard([
+        classification_figs['pie'],
+        classification_figs['bar'],
+        lifespan_figs['bar'],
+        lifespan_figs['scatter'],
+        language_figs['bar'],
+        language_figs['pie'],
+        physical_traits_figs['bar'],
+        physical_traits_figs['color_bar']
+    ])
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
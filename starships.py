@@ -1,13 +1,18 @@
+import asyncio
+import aiohttp
 import requests
-import json
-import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
 import pandas as pd
 
+from utils import cached_figures, downsample_scatter, fetch_swapi, safe_divide
+
+CACHE_FILE = "starships_cache.json"
+
 def fetch_starships_data(api_url="https://swapi.dev/api/starships/"):
     """
-    Fetch all starships data from the SWAPI endpoint with pagination handling.
+    Fetch all starships data through the local cache, which is revalidated
+    against the SWAPI endpoint once it is more than a day old.
 
     Args:
         api_url (str): The URL of the SWAPI starships endpoint. Defaults to the base URL.
@@ -15,56 +20,17 @@ def fetch_starships_data(api_url="https://swapi.dev/api/starships/"):
     Returns:
         list: A list of dictionaries containing starship data.
     """
-    starships = []
-    while api_url:
-        try:
-            response = requests.get(api_url)
-            response.raise_for_status()  # Raise an HTTPError for bad responses
-            data = response.json()
-            
-            # Append results to the starships list
-            starships.extend(data.get("results", []))
-
-            # Update the URL for the next page
-            api_url = data.get("next")
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching data: {e}")
-            break
-
-    return starships
-
-def try_float_conversion(value):
-    """Helper function to safely convert a value to float."""
     try:
-        if value in ["unknown", "n/a", None]:
-            return None
-        return float(str(value).replace(",", ""))
-    except ValueError:
-        return None
-
-def try_int_conversion(value):
-    """Helper function to safely convert a value to int."""
-    try:
-        if value in ["unknown", "n/a", None]:
-            return None
-        return int(str(value).replace(",", ""))
-    except ValueError:
-        return None
-
-def try_numeric_conversion(value, dtype):
-    """Helper function to safely convert a value to a numeric type."""
-    try:
-        if value in ["unknown", "n/a", None]:
-            return None
-        return dtype(str(value).replace(",", ""))
-    except ValueError:
-        return None
+        return fetch_swapi(api_url, CACHE_FILE)
+    except (aiohttp.ClientError, asyncio.TimeoutError, requests.exceptions.RequestException) as e:
+        print(f"Error fetching data: {e}")
+        return []
 
 def create_starships_dataframe(starships_data):
     """Create a DataFrame from starships data with proper numeric conversions."""
     df = pd.DataFrame(starships_data)
     
-    # Convert numeric columns
+    # Convert numeric columns; 'unknown', 'n/a' and other non-numeric values become missing
     numeric_columns = {
         'cost_in_credits': float,
         'length': float,
@@ -77,14 +43,23 @@ def create_starships_dataframe(starships_data):
     }
     
     for col, dtype in numeric_columns.items():
-        df[col] = df[col].apply(lambda x: try_numeric_conversion(x, dtype))
+        values = df[col].replace(['unknown', 'n/a', None], np.nan)
+        values = values.astype(str).str.replace(',', '', regex=False)
+        df[col] = pd.to_numeric(values, errors='coerce')
+        if dtype is int:
+            # Non-integral counts (e.g. ranges) are treated as missing
+            df[col] = df[col].where(df[col] % 1 == 0).astype('Int64')
+    
+    # Store low-cardinality text columns as categories
+    for col in ['starship_class', 'manufacturer']:
+        df[col] = df[col].astype('category')
     
     # Calculate derived metrics
     df['total_capacity'] = df['crew'].fillna(0) + df['passengers'].fillna(0)
-    df['cost_per_capacity'] = df.apply(
-        lambda row: row['cost_in_credits'] / row['total_capacity'] 
-        if row['total_capacity'] > 0 and row['cost_in_credits'] is not None 
-        else None, axis=1
+    df['cost_per_capacity'] = safe_divide(
+        df['cost_in_credits'].to_numpy(dtype=float),
+        df['total_capacity'].to_numpy(dtype=float),
+        fill=np.nan
     )
     
     return df
@@ -99,22 +74,8 @@ def analyze_cost_efficiency(data):
     Returns:
         DataFrame: The updated starship data with cost per person.
     """
-    # Ensure 'cost_per_person' column exists
-    if 'cost_per_person' not in data.columns:
-        data['cost_per_person'] = None
-    
-    # Calculate cost per person
-    def calculate_cost_per_person(row):
-        total_people = (row['crew'] or 0) + (row['passengers'] or 0)
-        if total_people > 0 and row['cost_in_credits'] is not None:
-            return row['cost_in_credits'] / total_people
-        return None
-    
-    # Apply the calculation
-    data['cost_per_person'] = data.apply(calculate_cost_per_person, axis=1)
-    
-    # Handle NaN and infinite values
-    data['cost_per_person'] = data['cost_per_person'].replace([np.inf, -np.inf], np.nan)
+    # Cost per person is the cost per capacity computed in create_starships_dataframe
+    data['cost_per_person'] = data['cost_per_capacity'].replace([np.inf, -np.inf], np.nan)
     data['cost_per_person'] = data['cost_per_person'].fillna(0)
     
     return data
@@ -123,10 +84,12 @@ def visualize_cost_efficiency(data):
     """
     Visualize cost per person for starships.
     """
+    import plotly.express as px
+
     filtered_data = data[data['cost_per_person'].notna()].sort_values('cost_per_person')
     fig = px.bar(
-        x=filtered_data['name'],
-        y=filtered_data['cost_per_person'],
+        x=filtered_data['name'].to_numpy(dtype=object),
+        y=filtered_data['cost_per_person'].to_numpy(dtype=float, na_value=np.nan),
         title='Cost Efficiency of Starships',
         labels={'x': 'Starship', 'y': 'Cost per Person (Credits)'},
         template='plotly_dark'
@@ -147,11 +110,10 @@ def analyze_cargo_utilization(data):
     # Fill missing cargo_capacity with 0
     data['cargo_capacity'] = data['cargo_capacity'].fillna(0)
 
-    # Calculate cargo to person ratio
-    data['cargo_to_person_ratio'] = data.apply(
-        lambda row: row['cargo_capacity'] / (row['crew'] + row['passengers']) 
-        if (row['crew'] + row['passengers']) > 0 else 0, 
-        axis=1
+    # Calculate cargo to person ratio in a single pass; ships without capacity stay at 0
+    data['cargo_to_person_ratio'] = safe_divide(
+        data['cargo_capacity'].to_numpy(dtype=float),
+        data['total_capacity'].to_numpy(dtype=float)
     )
 
     return data
@@ -160,10 +122,12 @@ def visualize_cargo_utilization(data):
     """
     Visualize cargo-to-person ratios of starships.
     """
+    import plotly.express as px
+
     filtered_data = data[data['cargo_to_person_ratio'] > 0].sort_values('cargo_to_person_ratio')
     fig = px.bar(
-        x=filtered_data['name'],
-        y=filtered_data['cargo_to_person_ratio'],
+        x=filtered_data['name'].to_numpy(dtype=object),
+        y=filtered_data['cargo_to_person_ratio'].to_numpy(dtype=float, na_value=np.nan),
         title='Cargo Utilization of Starships',
         labels={'x': 'Starship', 'y': 'Cargo to Person Ratio'},
         template='plotly_dark'
@@ -183,15 +147,17 @@ def calculate_custom_score(data):
     """
     # Fill missing values
     columns_to_fill = ['MGLT', 'hyperdrive_rating', 'crew', 'passengers', 'cargo_capacity']
-    data[columns_to_fill] = data[columns_to_fill].fillna(0)
-
-    # Calculate custom score with weights for each attribute
-    data['custom_score'] = (
-        (data['MGLT'] * 0.4) +                    # Weight of 0.4 for speed (MGLT)
-        (data['hyperdrive_rating'] * 0.3) +       # Weight of 0.3 for hyperdrive rating
-        ((data['crew'] + data['passengers']) * 0.2) +  # Weight of 0.2 for crew + passengers
-        (data['cargo_capacity'] * 0.1)            # Weight of 0.1 for cargo capacity
-    )
+    data.fillna({col: 0 for col in columns_to_fill}, inplace=True)
+
+    # Calculate custom score as one weighted sum over the attribute matrix
+    score_weights = {
+        'MGLT': 0.4,                  # Weight of 0.4 for speed (MGLT)
+        'hyperdrive_rating': 0.3,     # Weight of 0.3 for hyperdrive rating
+        'total_capacity': 0.2,        # Weight of 0.2 for crew + passengers
+        'cargo_capacity': 0.1         # Weight of 0.1 for cargo capacity
+    }
+    attributes = data[list(score_weights)].to_numpy(dtype=float)
+    data['custom_score'] = attributes @ np.fromiter(score_weights.values(), dtype=float)
     
     return data
 
@@ -199,10 +165,12 @@ def visualize_starship_scores(data):
     """
     Visualize starships based on their custom scores.
     """
+    import plotly.express as px
+
     sorted_data = data.sort_values('custom_score', ascending=False)
     fig = px.bar(
-        x=sorted_data['name'],
-        y=sorted_data['custom_score'],
+        x=sorted_data['name'].to_numpy(dtype=object),
+        y=sorted_data['custom_score'].to_numpy(dtype=float, na_value=np.nan),
         title='Starship Utility Scoring',
         labels={'x': 'Starship', 'y': 'Custom Score'},
         template='plotly_dark'
@@ -210,8 +178,11 @@ def visualize_starship_scores(data):
     fig.update_layout(xaxis_tickangle=-45)
     fig.show()
 
+@cached_figures('starship_class')
 def analyze_starship_classes(df):
     """Analyze starship classes distribution and characteristics."""
+    import plotly.express as px
+
     if df.empty:
         return go.Figure(), go.Figure()
     
@@ -234,14 +205,21 @@ def analyze_starship_classes(df):
     
     return fig1
 
+@cached_figures('name', 'cost_in_credits', 'max_atmosphering_speed', 'starship_class')
 def analyze_cost_metrics(df):
     """Analyze cost-related metrics of starships."""
+    import plotly.express as px
+
     if df.empty:
         return go.Figure(), go.Figure()
     
+    # Rows with a known cost, filtered once for both figures
+    priced_df = df[(df['cost_in_credits'] > 0).to_numpy()]
+    
     # Cost vs Speed
+    scatter_df = downsample_scatter(priced_df, 'cost_in_credits', 'max_atmosphering_speed')
     fig1 = px.scatter(
-        df[df['cost_in_credits'] > 0],
+        scatter_df,
         x='cost_in_credits',
         y='max_atmosphering_speed',
         color='starship_class',
@@ -261,7 +239,7 @@ def analyze_cost_metrics(df):
     )
     
     # Top 10 most expensive starships
-    top_10_cost = df[df['cost_in_credits'] > 0].nlargest(10, 'cost_in_credits')
+    top_10_cost = priced_df.nlargest(10, 'cost_in_credits')
     
     fig2 = px.bar(
         top_10_cost,
@@ -281,14 +259,18 @@ def analyze_cost_metrics(df):
     
     return fig1, fig2
 
+@cached_figures('name', 'passengers', 'crew', 'cargo_capacity', 'total_capacity', 'starship_class')
 def analyze_capacity_metrics(df):
     """Analyze capacity-related metrics of starships."""
+    import plotly.express as px
+
     if df.empty:
         return go.Figure(), go.Figure()
     
     # Passenger vs Cargo capacity
+    scatter_df = downsample_scatter(df[df['cargo_capacity'] > 0], 'passengers', 'cargo_capacity')
     fig1 = px.scatter(
-        df[df['cargo_capacity'] > 0],
+        scatter_df,
         x='passengers',
         y='cargo_capacity',
         color='starship_class',
@@ -308,8 +290,8 @@ def analyze_capacity_metrics(df):
     )
     
     # Top 10 starships by total capacity
-    df['total_capacity'] = df['passengers'] + df['crew']
     top_10_capacity = df.nlargest(10, 'total_capacity')
+    top_10_capacity = top_10_capacity.astype({'passengers': float, 'crew': float})
     
     fig2 = px.bar(
         top_10_capacity,
@@ -329,14 +311,18 @@ def analyze_capacity_metrics(df):
     
     return fig1, fig2
 
+@cached_figures('name', 'length', 'max_atmosphering_speed', 'hyperdrive_rating', 'starship_class')
 def analyze_performance_metrics(df):
     """Analyze performance-related metrics of starships."""
+    import plotly.express as px
+
     if df.empty:
         return go.Figure(), go.Figure()
     
     # Speed vs Length
+    scatter_df = downsample_scatter(df[df['length'] > 0], 'length', 'max_atmosphering_speed')
     fig1 = px.scatter(
-        df[df['length'] > 0],
+        scatter_df,
         x='length',
         y='max_atmosphering_speed',
         color='starship_class',
@@ -377,12 +363,18 @@ def get_starship_stats(df):
     if df.empty:
         return {}
     
+    # Reduce the raw arrays directly; missing values are skipped as in Series.mean
+    cost = df['cost_in_credits'].to_numpy(dtype=float)
+    speed = df['max_atmosphering_speed'].to_numpy(dtype=float)
+    capacity = df['total_capacity'].to_numpy(dtype=float, na_value=np.nan)
+    class_codes = df['starship_class'].cat.codes.to_numpy()
+    
     stats = {
         'total_starships': len(df),
-        'unique_classes': df['starship_class'].nunique(),
-        'avg_cost': df['cost_in_credits'].mean(),
-        'avg_speed': df['max_atmosphering_speed'].mean(),
-        'avg_capacity': df['total_capacity'].mean()
+        'unique_classes': len(pd.unique(class_codes[class_codes >= 0])),
+        'avg_cost': np.nanmean(cost),
+        'avg_speed': np.nanmean(speed),
+        'avg_capacity': np.nanmean(capacity)
     }
     
     return stats
@@ -0,0 +1,591 @@
+import asyncio
+import copy
+import functools
+import hashlib
+import logging
+import math
+import os
+import time
+import webbrowser
+from collections import OrderedDict
+from pathlib import Path
+import aiohttp
+import numpy as np
+import orjson
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+# Serialize Plotly figures with orjson rather than the stdlib encoder
+pio.json.config.default_engine = 'orjson'
+
+# Maximum number of markers handed to a single Plotly scatter trace
+MAX_SCATTER_POINTS = 3000
+
+# Concurrency and retry settings for the asynchronous SWAPI fetcher
+MAX_CONNECTIONS_PER_HOST = 8
+MAX_CONCURRENT_REQUESTS = 8
+MAX_RETRIES = 5
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRY_DELAY = 30
+
+# Shared keep-alive HTTP session so SWAPI requests reuse pooled connections;
+# the pool is sized like the asynchronous fetcher's per-host connection limit
+REQUEST_TIMEOUT = 10
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=MAX_CONNECTIONS_PER_HOST,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=sorted(RETRY_STATUSES))
+))
+
+# Seconds a cached SWAPI response is used before it is revalidated
+CACHE_MAX_AGE = 24 * 60 * 60
+
+# Number of analysis results kept by cached_figures per function
+FIGURE_CACHE_SIZE = 32
+
+def lttb_indices(x, y, n_out):
+    """
+    Select representative points with Largest-Triangle-Three-Buckets.
+
+    Args:
+        x (array-like): X coordinates.
+        y (array-like): Y coordinates.
+        n_out (int): Number of points to keep.
+
+    Returns:
+        np.ndarray: Sorted positional indices of the selected points.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # LTTB walks the points in x order
+    order = np.argsort(x, kind='stable')
+    xs, ys = x[order], y[order]
+
+    # First and last points are always kept; the rest are split into buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = xs[end:next_end].mean()
+        avg_y = ys[end:next_end].mean()
+
+        # Keep the point forming the largest triangle with the previous pick
+        # and the average of the next bucket
+        area = np.abs(
+            (xs[a] - avg_x) * (ys[start:end] - ys[a])
+            - (xs[a] - xs[start:end]) * (avg_y - ys[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return np.sort(order[selected])
+
+def downsample_scatter(df, x, y, max_points=MAX_SCATTER_POINTS):
+    """
+    Cap the rows of a scatter plot input at max_points using LTTB.
+
+    Args:
+        df (pd.DataFrame): Data to be plotted.
+        x (str): Column used for the x axis.
+        y (str): Column used for the y axis.
+        max_points (int): Maximum number of rows to return.
+
+    Returns:
+        pd.DataFrame: df unchanged if small enough, otherwise a representative
+        subset of its plottable (finite x and y) rows.
+    """
+    if len(df) <= max_points:
+        return df
+    x_arr = df[x].to_numpy(dtype=float, na_value=np.nan)
+    y_arr = df[y].to_numpy(dtype=float, na_value=np.nan)
+
+    # Plotly drops points without finite coordinates, so don't spend buckets on them
+    finite = np.isfinite(x_arr) & np.isfinite(y_arr)
+    if not finite.all():
+        df, x_arr, y_arr = df[finite], x_arr[finite], y_arr[finite]
+        if len(df) <= max_points:
+            return df
+    return df.iloc[lttb_indices(x_arr, y_arr, max_points)]
+
+def top_positions(values, n):
+    """
+    Return the positions of the n largest values, largest first.
+
+    Candidates are preselected in linear time with np.partition, keeping every
+    value tied with the n-th largest, and then ordered with a stable sort, so
+    ties are broken by position like nlargest(keep='first'). NaNs are ignored.
+
+    Args:
+        values (np.ndarray): Float values to rank.
+        n (int): Number of positions to return.
+
+    Returns:
+        np.ndarray: Positional indices into values.
+    """
+    idx = np.flatnonzero(~np.isnan(values))
+    if len(idx) > n > 0:
+        kth = np.partition(values[idx], -n)[-n]
+        idx = idx[values[idx] >= kth]
+    idx = idx[np.argsort(-values[idx], kind='stable')]
+    return idx[:n]
+
+def top_n(df, col, n=10):
+    """
+    Return the n rows with the largest values in col, in descending order.
+
+    Ties keep their original order, as with nlargest(keep='first').
+    Missing values are ignored.
+
+    Args:
+        df (pd.DataFrame): Data to select from.
+        col (str): Column to rank by.
+        n (int): Number of rows to return.
+
+    Returns:
+        pd.DataFrame: The top n rows of df.
+    """
+    arr = df[col].to_numpy(dtype=float, na_value=np.nan)
+    return df.iloc[top_positions(arr, n)]
+
+def top_value_counts(series, n=10):
+    """
+    Count the values of a series and return the n most frequent.
+
+    Args:
+        series (pd.Series): Values to count.
+        n (int): Number of values to return.
+
+    Returns:
+        pd.Series: Counts indexed by value, in descending order; ties keep
+        the order in which the values first appear.
+    """
+    codes, uniques = pd.factorize(series)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    idx = top_positions(counts.astype(float), n)
+    return pd.Series(counts[idx], index=uniques[idx])
+
+def count_tokens(series, n=10):
+    """
+    Count the comma-separated values of a column and return the n most frequent.
+
+    Args:
+        series (pd.Series): Comma-separated text, e.g. 'arid, temperate'.
+        n (int): Number of values to return.
+
+    Returns:
+        pd.Series: Counts indexed by value, in descending order; ties keep
+        the order in which the values first appear.
+    """
+    tokens = np.fromiter(
+        (token.strip() for value in series.dropna() for token in value.split(',')),
+        dtype=object
+    )
+    return top_value_counts(tokens, n)
+
+def safe_divide(numerator, denominator, fill=0.0):
+    """
+    Divide two arrays element-wise, using fill where the denominator is not positive.
+
+    Args:
+        numerator (np.ndarray): Dividends.
+        denominator (np.ndarray): Divisors.
+        fill (float): Result for rows without a positive denominator.
+
+    Returns:
+        np.ndarray: The quotients as floats.
+    """
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    out = np.full(numerator.shape, fill, dtype=float)
+    np.divide(numerator, denominator, out=out, where=denominator > 0)
+    return out
+
+def group_means(keys, values):
+    """
+    Average values per distinct key, ignoring missing keys and values.
+
+    Args:
+        keys (pd.Series): Group labels.
+        values (pd.Series): Numbers to average.
+
+    Returns:
+        pd.Series: Mean per key, in order of first appearance.
+    """
+    codes, uniques = pd.factorize(keys)
+    values = values.to_numpy(dtype=float, na_value=np.nan)
+    valid = (codes >= 0) & ~np.isnan(values)
+    sums = np.bincount(codes[valid], weights=values[valid], minlength=len(uniques))
+    counts = np.bincount(codes[valid], minlength=len(uniques))
+    has_values = counts > 0
+    return pd.Series(sums[has_values] / counts[has_values], index=uniques[has_values])
+
+def frame_fingerprint(df):
+    """
+    Build a hashable key describing the content of a DataFrame.
+
+    Args:
+        df (pd.DataFrame): Frame to fingerprint.
+
+    Returns:
+        tuple: Shape, columns and a digest of the frame's values.
+    """
+    try:
+        hashes = pd.util.hash_pandas_object(df, index=True)
+    except TypeError:
+        # Columns holding lists (e.g. film URLs) cannot be hashed by pandas,
+        # so hash the text form of the object columns instead
+        as_text = {col: str for col in df.columns if df[col].dtype == object}
+        hashes = pd.util.hash_pandas_object(df.astype(as_text), index=True)
+    content = hashes.to_numpy().tobytes()
+    return df.shape, tuple(df.columns), hashlib.sha1(content).hexdigest()
+
+# Lets st.cache_data key DataFrames with list columns without pickling them
+FRAME_HASH_FUNCS = {pd.DataFrame: frame_fingerprint}
+
+def copy_figures(result):
+    """
+    Copy the figures in an analysis result (a figure, or a tuple/list/dict of them).
+
+    go.Figure(fig) keeps trace data as numpy arrays, unlike copy.deepcopy,
+    which turns them into base64 dictionaries.
+    """
+    if isinstance(result, dict):
+        return {key: copy_figures(value) for key, value in result.items()}
+    if isinstance(result, (list, tuple)):
+        return type(result)(copy_figures(value) for value in result)
+    if isinstance(result, go.Figure):
+        return go.Figure(result)
+    return copy.deepcopy(result)
+
+def cached_figures(*columns):
+    """
+    Memoize a figure-building analysis on the content of the columns it reads.
+
+    Only the listed columns are fingerprinted, so unrelated columns (such as
+    lists of film URLs) neither invalidate the cache nor slow down the key.
+    Repeated calls with identical data return copies of the stored figures,
+    so callers can restyle them without affecting the cache.
+
+    Args:
+        *columns (str): DataFrame columns read by the decorated analysis.
+    """
+    def decorator(func):
+        cache = OrderedDict()
+
+        @functools.wraps(func)
+        def wrapper(df, *args, **kwargs):
+            used = df[df.columns.intersection(list(columns), sort=False)]
+            key = (frame_fingerprint(used), args, tuple(sorted(kwargs.items())))
+            if key in cache:
+                cache.move_to_end(key)
+            else:
+                cache[key] = func(df, *args, **kwargs)
+                if len(cache) > FIGURE_CACHE_SIZE:
+                    cache.popitem(last=False)
+            return copy_figures(cache[key])
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorator
+
+def write_dashboard(figures, path='dashboard.html', open_browser=True):
+    """
+    Render several figures into one HTML page that loads Plotly.js only once.
+
+    Args:
+        figures (list): Plotly figures, in display order.
+        path (str): Output HTML file.
+        open_browser (bool): Open the page in the default browser when done.
+
+    Returns:
+        Path: The written file.
+    """
+    sections = [
+        pio.to_html(fig, include_plotlyjs='cdn' if i == 0 else False, full_html=False)
+        for i, fig in enumerate(figures)
+    ]
+    output = Path(path)
+    output.write_text('<html><body>' + ''.join(sections) + '</body></html>', encoding='utf-8')
+    if open_browser:
+        webbrowser.open(output.resolve().as_uri())
+    return output
+
+def validators_file(cache_file):
+    """Return the sidecar file holding HTTP validators for a cache file."""
+    return os.path.splitext(cache_file)[0] + '_headers.json'
+
+def read_json(path):
+    """Load JSON from path, returning None if the file does not exist."""
+    try:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    except FileNotFoundError:
+        return None
+
+def write_json(data, path):
+    """Write data to path as JSON."""
+    with open(path, 'wb') as f:
+        f.write(orjson.dumps(data))
+
+def cache_age(path):
+    """Return the age of a file in seconds, or None if it does not exist."""
+    try:
+        return time.time() - os.path.getmtime(path)
+    except FileNotFoundError:
+        return None
+
+def page_validators(headers, page):
+    """Describe a fetched page (HTTP validators and its place in the results) for the sidecar."""
+    return {
+        'etag': headers.get('ETag'),
+        'last_modified': headers.get('Last-Modified'),
+        'count': len(page['results']),
+        'next': page.get('next')
+    }
+
+def fetch_swapi_pages(url, cache_file):
+    """
+    Revalidate an existing JSON cache of a SWAPI endpoint page by page.
+
+    The ETag / Last-Modified validators of each page are stored next to the
+    cache, so this sends conditional GETs and only re-downloads pages the
+    server reports as changed (anything else comes back as a 304).
+
+    Args:
+        url (str): First page of the SWAPI endpoint.
+        cache_file (str): JSON file holding the combined results.
+
+    Returns:
+        list: The combined results of all pages.
+    """
+    cached = read_json(cache_file)
+    validators = read_json(validators_file(cache_file)) or {}
+
+    # Position of each previously fetched page inside the cached results
+    offsets = {}
+    offset, page_url = 0, url
+    while page_url in validators and page_url not in offsets:
+        offsets[page_url] = offset
+        offset += validators[page_url]['count']
+        page_url = validators[page_url]['next']
+
+    results = []
+    new_validators = {}
+    while url:
+        page = validators.get(url) if url in offsets else None
+        request_headers = {}
+        if page:
+            if page.get('etag'):
+                request_headers['If-None-Match'] = page['etag']
+            if page.get('last_modified'):
+                request_headers['If-Modified-Since'] = page['last_modified']
+
+        response = SESSION.get(url, headers=request_headers, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 304 and page:
+            start = offsets[url]
+            page_results = cached[start:start + page['count']]
+            next_url = page['next']
+        else:
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+            page_results = data['results']
+            next_url = data.get('next')
+            page = {}
+
+        new_validators[url] = {
+            'etag': response.headers.get('ETag', page.get('etag')),
+            'last_modified': response.headers.get('Last-Modified', page.get('last_modified')),
+            'count': len(page_results),
+            'next': next_url
+        }
+        results.extend(page_results)
+        url = next_url
+
+    write_json(results, cache_file)
+    write_json(new_validators, validators_file(cache_file))
+
+    return results
+
+def fetch_swapi(endpoint, cache_path, max_age=CACHE_MAX_AGE):
+    """
+    Fetch a SWAPI endpoint through a local JSON cache that expires after max_age.
+
+    A fresh cache is returned without touching the network. Without any cache
+    every page is fetched concurrently and the validators of each page are
+    stored next to it; a stale cache is revalidated with conditional GETs by
+    fetch_swapi_pages, so unchanged pages come back as 304s. If SWAPI cannot
+    be reached, the stale cache is served instead.
+
+    Args:
+        endpoint (str): First page of the SWAPI endpoint.
+        cache_path (str): JSON file holding the combined results.
+        max_age (float): Seconds a cache is trusted before it is revalidated.
+
+    Returns:
+        list: The combined results of all pages.
+    """
+    age = cache_age(cache_path)
+    if age is None:
+        validators = {}
+        results = fetch_swapi_concurrently(endpoint, validators)
+        # Replace any sidecar left from an older cache before the cache itself
+        write_json(validators, validators_file(cache_path))
+        write_json(results, cache_path)
+        return results
+    if age < max_age:
+        return read_json(cache_path)
+    try:
+        return fetch_swapi_pages(endpoint, cache_path)
+    except requests.exceptions.RequestException as e:
+        logging.warning(f"Could not revalidate {cache_path}, using the cached copy: {e}")
+        return read_json(cache_path)
+
+def retry_delay(retry_after, default):
+    """Return the delay requested by a Retry-After header (in seconds, capped), or default."""
+    try:
+        return min(max(float(retry_after), 0), MAX_RETRY_DELAY)
+    except (TypeError, ValueError):
+        return default
+
+async def fetch_page_async(session, url, semaphore, validators=None):
+    """
+    Fetch a single SWAPI page, retrying rate-limited and failed requests.
+
+    Requests answered with 429 or a 5xx status, and connection errors or
+    timeouts, are retried after the Retry-After delay when the server sends
+    one, otherwise with exponential backoff. Any other error status is raised
+    immediately. The semaphore caps how many requests are in flight at once.
+
+    Args:
+        session (aiohttp.ClientSession): Session used for the request.
+        url (str): Page URL.
+        semaphore (asyncio.Semaphore): Limits concurrent requests.
+        validators (dict): If given, receives the page's validators keyed by url.
+
+    Returns:
+        dict: The decoded page.
+    """
+    for attempt in range(MAX_RETRIES):
+        delay = RETRY_BACKOFF * 2 ** attempt
+        try:
+            async with semaphore, session.get(url) as response:
+                if response.status in RETRY_STATUSES and attempt < MAX_RETRIES - 1:
+                    delay = retry_delay(response.headers.get('Retry-After'), delay)
+                else:
+                    response.raise_for_status()
+                    page = orjson.loads(await response.read())
+                    if validators is not None:
+                        validators[url] = page_validators(response.headers, page)
+                    return page
+        except aiohttp.ClientResponseError:
+            # Statuses outside RETRY_STATUSES (e.g. 404) will not succeed on retry
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if attempt == MAX_RETRIES - 1:
+                raise
+        await asyncio.sleep(delay)
+
+async def fetch_all_pages_async(url, validators=None):
+    """
+    Fetch the first page of an endpoint, then every remaining page concurrently.
+
+    The page count is derived from the 'count' field of the first page, so the
+    remaining pages are requested together rather than by following 'next'.
+
+    Args:
+        url (str): Base URL of the SWAPI endpoint.
+        validators (dict): If given, receives each page's validators keyed by url.
+
+    Returns:
+        list: The combined results of all pages, in page order.
+
+    Raises:
+        Exception: The first error of any page that could not be fetched.
+    """
+    connector = aiohttp.TCPConnector(limit_per_host=MAX_CONNECTIONS_PER_HOST)
+    timeout = aiohttp.ClientTimeout(total=30)
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        first = await fetch_page_async(session, url, semaphore, validators)
+        results = list(first['results'])
+
+        page_size = len(first['results'])
+        if not first.get('next') or not page_size:
+            return results
+
+        n_pages = math.ceil(first['count'] / page_size)
+        urls = [f"{url}?page={i}" for i in range(2, n_pages + 1)]
+        pages = await asyncio.gather(
+            *(fetch_page_async(session, page_url, semaphore, validators) for page_url in urls),
+            return_exceptions=True
+        )
+
+        failures = [(page_url, page) for page_url, page in zip(urls, pages) if isinstance(page, Exception)]
+        for page_url, error in failures:
+            logging.error(f"Failed to fetch {page_url}: {error}")
+        if failures:
+            # A partial result must never reach the caches, so fail the whole fetch
+            raise failures[0][1]
+
+        for page in pages:
+            results.extend(page['results'])
+
+    return results
+
+def fetch_swapi_sequentially(url, validators=None):
+    """
+    Fetch all pages of a SWAPI endpoint one after another over the shared session.
+
+    Args:
+        url (str): Base URL of the SWAPI endpoint.
+        validators (dict): If given, receives each page's validators keyed by url.
+
+    Returns:
+        list: The combined results of all pages.
+    """
+    results = []
+    while url:
+        response = SESSION.get(url, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        if validators is not None:
+            validators[url] = page_validators(response.headers, data)
+        results.extend(data['results'])
+        url = data.get('next')
+    return results
+
+def fetch_swapi_concurrently(url, validators=None):
+    """
+    Fetch all pages of a SWAPI endpoint concurrently.
+
+    If an event loop is already running (e.g. inside a notebook), asyncio.run
+    cannot be used, so the pages are fetched sequentially over the shared
+    keep-alive session instead.
+
+    Args:
+        url (str): Base URL of the SWAPI endpoint.
+        validators (dict): If given, receives each page's validators keyed by url.
+
+    Returns:
+        list: The combined results of all pages.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(fetch_all_pages_async(url, validators))
+    return fetch_swapi_sequentially(url, validators)
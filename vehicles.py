@@ -1,28 +1,12 @@
-import requests
-import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
-import json
+import numpy as np
+import pandas as pd
+
+from utils import cached_figures, downsample_scatter, fetch_swapi, group_means, write_dashboard
 
 def fetch_vehicles_data():
-    """Fetch vehicles data from local cache or SWAPI."""
-    try:
-        with open('vehicles_cache.json', 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        url = "https://swapi.dev/api/vehicles/"
-        all_vehicles = []
-        
-        while url:
-            response = requests.get(url)
-            data = response.json()
-            all_vehicles.extend(data['results'])
-            url = data.get('next')
-        
-        with open('vehicles_cache.json', 'w') as f:
-            json.dump(all_vehicles, f)
-        
-        return all_vehicles
+    """Fetch vehicles data from local cache or SWAPI, revalidating caches older than a day."""
+    return fetch_swapi("https://swapi.dev/api/vehicles/", 'vehicles_cache.json')
 
 def create_vehicles_dataframe(vehicles_data):
     """Create and clean the vehicles DataFrame."""
@@ -42,11 +26,9 @@ def create_vehicles_dataframe(vehicles_data):
     }
     
     for field, dtype in numeric_fields.items():
-        # Replace 'unknown' and 'n/a' with None
-        df[field] = df[field].replace(['unknown', 'n/a'], pd.NA)
-        
-        # Convert to numeric, coercing errors to NaN
-        df[field] = pd.to_numeric(df[field], errors='coerce')
+        # Convert whole columns at once; 'unknown', 'n/a' and other text become NaN
+        values = df[field].astype(str).str.replace(',', '', regex=False)
+        df[field] = pd.to_numeric(values, errors='coerce')
         
         # Fill NaN values with 0
         df[field] = df[field].fillna(0)
@@ -55,13 +37,20 @@ def create_vehicles_dataframe(vehicles_data):
         if dtype == int:
             df[field] = df[field].astype('Int64')  # Use Int64 to handle NaN
     
+    # Store low-cardinality text columns as categories
+    for col in ['vehicle_class', 'manufacturer']:
+        df[col] = df[col].astype('category')
+    
     # Add derived fields
     df['total_capacity'] = df['passengers'] + df['crew']
     
     return df
 
+@cached_figures('vehicle_class', 'max_atmosphering_speed')
 def analyze_vehicle_classes(df):
     """Create visualizations for vehicle classes."""
+    import plotly.express as px
+
     if df.empty:
         return go.Figure(), go.Figure()
     
@@ -83,14 +72,15 @@ def analyze_vehicle_classes(df):
     )
     
     # Average speed by class
-    avg_speed = df.groupby('vehicle_class')['max_atmosphering_speed'].mean().sort_values(ascending=False)
+    avg_speed = group_means(df['vehicle_class'], df['max_atmosphering_speed']).sort_values(ascending=False)
     
+    speed = avg_speed.to_numpy(dtype=float, na_value=np.nan)
     fig2 = px.bar(
-        x=avg_speed.index,
-        y=avg_speed.values,
+        x=avg_speed.index.to_numpy(dtype=object),
+        y=speed,
         title='Average Speed by Vehicle Class',
         labels={'x': 'Vehicle Class', 'y': 'Average Speed'},
-        color=avg_speed.values,
+        color=speed,
         color_continuous_scale='Viridis'
     )
     
@@ -104,14 +94,21 @@ def analyze_vehicle_classes(df):
     
     return fig1, fig2
 
+@cached_figures('name', 'cost_in_credits', 'max_atmosphering_speed', 'vehicle_class')
 def analyze_cost_metrics(df):
     """Create visualizations for cost analysis."""
+    import plotly.express as px
+
     if df.empty:
         return go.Figure(), go.Figure()
     
+    # Rows with a known cost, filtered once for both figures
+    priced_df = df[(df['cost_in_credits'] > 0).to_numpy()]
+    
     # Cost vs Speed
+    scatter_df = downsample_scatter(priced_df, 'cost_in_credits', 'max_atmosphering_speed')
     fig1 = px.scatter(
-        df[df['cost_in_credits'] > 0],
+        scatter_df,
         x='cost_in_credits',
         y='max_atmosphering_speed',
         color='vehicle_class',
@@ -131,7 +128,7 @@ def analyze_cost_metrics(df):
     )
     
     # Top 10 most expensive vehicles
-    top_10_cost = df[df['cost_in_credits'] > 0].nlargest(10, 'cost_in_credits')
+    top_10_cost = priced_df.nlargest(10, 'cost_in_credits')
     
     fig2 = px.bar(
         top_10_cost,
@@ -151,14 +148,18 @@ def analyze_cost_metrics(df):
     
     return fig1, fig2
 
+@cached_figures('name', 'passengers', 'crew', 'cargo_capacity', 'total_capacity', 'vehicle_class')
 def analyze_capacity_metrics(df):
     """Create visualizations for capacity analysis."""
+    import plotly.express as px
+
     if df.empty:
         return go.Figure(), go.Figure()
     
     # Passenger vs Cargo capacity
+    scatter_df = downsample_scatter(df[df['cargo_capacity'] > 0], 'passengers', 'cargo_capacity')
     fig1 = px.scatter(
-        df[df['cargo_capacity'] > 0],
+        scatter_df,
         x='passengers',
         y='cargo_capacity',
         color='vehicle_class',
@@ -177,9 +178,9 @@ def analyze_capacity_metrics(df):
         font=dict(color='white')
     )
     
-    # Top 10 vehicles by total capacity
-    df['total_capacity'] = df['passengers'] + df['crew']
+    # Top 10 vehicles by total capacity (computed in create_vehicles_dataframe)
     top_10_capacity = df.nlargest(10, 'total_capacity')
+    top_10_capacity = top_10_capacity.astype({'passengers': float, 'crew': float})
     
     fig2 = px.bar(
         top_10_capacity,
@@ -199,14 +200,18 @@ def analyze_capacity_metrics(df):
     
     return fig1, fig2
 
+@cached_figures('name', 'length', 'max_atmosphering_speed', 'vehicle_class')
 def analyze_performance_metrics(df):
     """Create visualizations for vehicle performance."""
+    import plotly.express as px
+
     if df.empty:
         return go.Figure(), go.Figure()
     
     # Speed vs Length
+    scatter_df = downsample_scatter(df[df['length'] > 0], 'length', 'max_atmosphering_speed')
     fig1 = px.scatter(
-        df[df['length'] > 0],
+        scatter_df,
         x='length',
         y='max_atmosphering_speed',
         color='vehicle_class',
@@ -267,18 +272,13 @@ def main():
         print("Analyzing performance metrics...")
         performance_figures = analyze_performance_metrics(df)
 
-        # Show the figures
-        for figure in vehicle_class_figures:
-            figure.show()
-
-        for figure in cost_figures:
-            figure.show()
-
-        for figure in capacity_figures:
-            figure.show()
-
-        for figure in performance_figures:
-            figure.show()
+        # Show every figure on a single dashboard page
+        write_dashboard([
+            *vehicle_class_figures,
+            *cost_figures,
+            *capacity_figures,
+            *performance_figures
+        ])
 
     except Exception as e:
         print(f"An error occurred: {e}")